@@ -1,149 +1,585 @@
 import os
+import sys
+import logging
+import time
+import asyncio
 import requests
-import json
-import base64
-from typing import Dict, Any, Optional
+import orjson
+import msgspec
+import hashlib
+from email.utils import parsedate_to_datetime
+import atexit
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import PurePosixPath
+from typing import Dict, Any, List, Optional, Tuple, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("Github_MCP")
 
+# stdout carries the MCP stdio transport, so diagnostics go to stderr through logging
+logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+logger = logging.getLogger("github_mcp")
+
+
+def jdump(obj) -> str:
+    """Serializes a tool result to compact JSON; the client parses it, so indentation only adds bytes."""
+    return orjson.dumps(obj).decode()
+
+# --- HTTP sessions ---
+# Each token gets one pooled session for the whole process, so repeated tool calls reuse TCP/TLS
+# connections instead of paying a fresh handshake per request, and the auth headers are set on it
+# once rather than rebuilt for every request. Requests only pass headers= to override these.
+# The adapter only retries transient 5xx errors, using its own short backoff rather than an uncapped
+# Retry-After sleep, then hands the last response back so it becomes a GitHubAPIError; rate limits
+# (403/429) are handled in GitHubHelper._send so waits can be capped and the remaining quota tracked.
+def _new_session(token: str) -> requests.Session:
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github.v3+json",
+        "X-GitHub-Api-Version": "2022-11-28" # Recommended by GitHub
+    })
+    session.mount("https://", HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], respect_retry_after_header=False, raise_on_status=False),
+    ))
+    return session
+
+# --- Concurrency cap ---
+# Tool handlers are async and run the blocking helper calls in worker threads. This caps how many
+# GitHub requests are in flight at once so bursts of tool calls do not trip the secondary rate limit.
+GH_SEM = asyncio.Semaphore(10)
+
+# --- Rate limit handling ---
+RATE_LIMIT_MAX_RETRIES = 3
+RATE_LIMIT_MAX_WAIT = 60 # seconds; waiting longer than this fails the call instead of hanging the tool
+RATE_LIMIT_THRESHOLD = 10 # below this many remaining requests, calls are spaced out until the window resets
+
+
+class TokenState:
+    """
+    A GitHub token with its authenticated session and the last (X-RateLimit-Remaining, X-RateLimit-Reset)
+    seen for it, per rate limit resource ("core", "graphql", ...).
+    """
+    def __init__(self, token: str):
+        self.token = token
+        self.session = _new_session(token)
+        self.limits: Dict[str, Tuple[int, float]] = {}
+
+    def record(self, response: requests.Response, resource: str) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_at = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset_at is not None:
+            self.limits[response.headers.get("X-RateLimit-Resource", resource)] = (int(remaining), float(reset_at))
+
+    def quota(self, resource: str) -> Tuple[float, float]:
+        """
+        Sort key for picking a token: remaining requests (unknown or already reset counts as unlimited),
+        then the sooner reset so that, when every token is exhausted, the one freed first wins.
+        """
+        limit = self.limits.get(resource)
+        if limit is None or limit[1] <= time.time():
+            return (float("inf"), 0.0)
+        return (limit[0], -limit[1])
+
+    def throttle_delay(self, resource: str) -> float:
+        """
+        Seconds to wait before the next request so the remaining quota lasts until the window resets.
+        Returns 0 when there is plenty of quota left, or when the wait would exceed RATE_LIMIT_MAX_WAIT
+        (the request is then sent anyway and GitHub's answer is surfaced to the caller).
+        """
+        limit = self.limits.get(resource)
+        if not limit or limit[0] >= RATE_LIMIT_THRESHOLD:
+            return 0.0
+        remaining, reset_at = limit
+        delay = (reset_at - time.time()) / (remaining + 1)
+        return delay if 0 < delay <= RATE_LIMIT_MAX_WAIT else 0.0
+
+
+def _load_tokens() -> List[TokenState]:
+    """Reads the comma-separated GITHUB_TOKENS pool, falling back to the single GITHUB_TOKEN."""
+    raw_tokens = os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN", "")
+    return [TokenState(token.strip()) for token in raw_tokens.split(",") if token.strip()]
+
+
+GITHUB_TOKENS = _load_tokens()
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """
+    Parses a Retry-After header, which RFC 9110 allows as either delay-seconds or an HTTP-date.
+    Returns None for a value that is neither, so the caller falls back to its other signals.
+    """
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(response: requests.Response, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying a rate limited response, or None if the response should not be retried.
+    Honors Retry-After, then X-RateLimit-Reset for an exhausted primary limit, then falls back to exponential backoff.
+    """
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = _parse_retry_after(response.headers.get("Retry-After", ""))
+    if retry_after is not None:
+        return retry_after
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        return max(float(response.headers.get("X-RateLimit-Reset", 0)) - time.time(), 0.0)
+    if response.status_code == 429 or "rate limit" in response.text.lower():
+        return float(2 ** attempt)
+    return None # A plain 403 is a permissions problem, retrying will not help
+
+# --- Conditional request cache ---
+# Maps "owner/repo/endpoint" to the (ETag, parsed JSON) of the last 200 response. Revalidating with
+# If-None-Match returns an empty 304 when nothing changed, which does not count against the rate limit.
+# Bounded LRU: entries can hold up to LARGE_FILE_THRESHOLD of file text, so the least recently used are
+# evicted past ETAG_CACHE_MAX_ENTRIES. Tool calls run in worker threads, hence the lock.
+ETAG_CACHE_MAX_ENTRIES = 128
+_ETAG_CACHE: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+_ETAG_CACHE_LOCK = threading.Lock()
+
+
+def _etag_cache_get(cache_key: str) -> Optional[Tuple[str, Any]]:
+    with _ETAG_CACHE_LOCK:
+        cached = _ETAG_CACHE.get(cache_key)
+        if cached is not None:
+            _ETAG_CACHE.move_to_end(cache_key)
+        return cached
+
+
+def _etag_cache_put(cache_key: str, etag: str, data: Any) -> None:
+    with _ETAG_CACHE_LOCK:
+        _ETAG_CACHE[cache_key] = (etag, data)
+        _ETAG_CACHE.move_to_end(cache_key)
+        while len(_ETAG_CACHE) > ETAG_CACHE_MAX_ENTRIES:
+            _ETAG_CACHE.popitem(last=False)
+
+# --- File downloads ---
+STREAM_CHUNK_SIZE = 64 * 1024
+LARGE_FILE_THRESHOLD = 1024 * 1024 # larger downloads are spooled to a temp file instead of returned inline
+# All spooled files live in one directory per process, named after their blob sha so a re-fetch of the
+# same content reuses the file; the directory is removed when the server exits.
+SPOOL_DIR = tempfile.mkdtemp(prefix="github_mcp_")
+atexit.register(shutil.rmtree, SPOOL_DIR, ignore_errors=True)
+RAW_MEDIA_TYPE = "application/vnd.github.raw"
+
+
+def _git_blob_sha(size: int, chunks) -> str:
+    """Computes the git blob SHA-1 of content, the same value the contents API reports as "sha"."""
+    digest = hashlib.sha1(b"blob %d\0" % size)
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+# --- Response schemas ---
+# REST responses are decoded straight into these structs with msgspec, so only the fields we return are
+# materialized; everything else in GitHub's payload (urls, _links, ...) is skipped during parsing.
+class ContentEntry(msgspec.Struct):
+    name: str
+    path: str
+    type: str # 'file', 'dir', 'symlink', etc.
+    size: Optional[int] = None
+    sha: Optional[str] = None
+    html_url: Optional[str] = None
+    download_url: Optional[str] = None
+
+
+class TreeEntry(msgspec.Struct):
+    path: str
+    type: str # 'blob' for files, 'tree' for directories, 'commit' for submodules
+    sha: str
+    size: Optional[int] = None # only present for blobs
+
+
+class Tree(msgspec.Struct):
+    sha: str
+    tree: List[TreeEntry]
+    truncated: bool = False # GitHub caps recursive trees at 100,000 entries / 7 MB
+
+
+# --- Directory listings ---
+DEFAULT_PAGE_SIZE = 100
+
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+
+LAST_MERGED_PR_QUERY = """
+query($owner: String!, $repo: String!) {
+  repository(owner: $owner, name: $repo) {
+    pullRequests(states: MERGED, first: 1, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      nodes {
+        number
+        title
+        url
+        mergedAt
+        mergedBy { login }
+        author { login }
+        body
+        headRefOid
+        baseRefName
+      }
+    }
+  }
+}
+"""
+
+def _summary(body: Optional[str], limit: int = 200) -> str:
+    """Truncates a PR body to `limit` characters, marking the cut with "..."."""
+    body = body or ""
+    return body[:limit] + "..." if len(body) > limit else body
+
+
+class GitHubAPIError(Exception):
+    """
+    An HTTP error status from the GitHub API. Only the status and reason are kept, so the
+    exception does not pin the response (and its body) in memory while it propagates.
+    """
+    __slots__ = ("status", "text")
+
+    def __init__(self, status: int, text: str):
+        super().__init__(f"{status} {text}")
+        self.status = status
+        self.text = text
+
+
+def _raise_for_status(response: requests.Response) -> None:
+    """Raises GitHubAPIError for a 4xx/5xx response, releasing its connection without reading the body."""
+    if response.status_code < 400:
+        return
+    status, reason, url = response.status_code, response.reason, response.url
+    response.close()
+    logger.error("GitHub API HTTP error: %s %s for %s", status, reason, url)
+    raise GitHubAPIError(status, reason) from None
+
+
 # --- Helper Class for GitHub API Interaction --- as good as class github from toollake/code/github 
 class GitHubHelper:
     """
     This class contains :
-    1. constructor to intialise owner, repo and github_token ( passed as env )
+    1. constructor to intialise owner, repo and the pool of tokens to authenticate with ( passed as env )
     2. make request function to make a request to github with args as method and endpoint and uses a common url with ower, repo and endpoint 
     """
-    def __init__(self, owner: str, repo: str, github_token: str):
+    def __init__(self, owner: str, repo: str, tokens: List[TokenState]):
         self.owner = owner
         self.repo = repo
-        self.github_token = github_token
-        self.headers = {
-            "Authorization": f"token {self.github_token}",
-            "Accept": "application/vnd.github.v3+json",
-            "X-GitHub-Api-Version": "2022-11-28" # Recommended by GitHub
-        }
-        print(f"GitHubHelper initialized for repository: {owner}/{repo}")
+        self.tokens = tokens
 
     def _make_github_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
         """
         Internal helper to make requests to the GitHub API.
         """
         url = f"https://api.github.com/repos/{self.owner}/{self.repo}/{endpoint}"
-        print(f"Making GitHub API request: {method.upper()} {url}")
+        logger.debug("Making GitHub API request: %s %s", method.upper(), url)
         try:
-            response = requests.request(method, url, headers=self.headers, timeout=20, **kwargs)
-            response.raise_for_status()
-            return response
-        except requests.exceptions.HTTPError as http_err:
-            print(f"GitHub API HTTP error: {http_err}. Response status: {http_err.response.status_code}. Response text: {http_err.response.text if http_err.response else 'No response body'}")
-            raise # Re-raise the exception to be handled by the calling tool function
+            response = self._send(method, url, **kwargs)
         except requests.exceptions.RequestException as req_err:
-            print(f"GitHub API Request (network/connection) error: {req_err}")
+            logger.error("GitHub API Request (network/connection) error: %s", req_err)
             raise
         except Exception as e:
-            print(f"Unexpected error in _make_github_request: {e}")
+            logger.exception("Unexpected error in _make_github_request: %s", e)
             raise
+        _raise_for_status(response) # 304 Not Modified is not an error and is handled by _get_json
+        return response
+
+    def _send(self, method: str, url: str, resource: str = "core", **kwargs) -> requests.Response:
+        """
+        Sends a request through the session of the pooled token that has the most quota left,
+        pacing it against that token's tracked rate limit. Rate limited (403/429) responses are retried up
+        to RATE_LIMIT_MAX_RETRIES times, switching straight to another token when one still has quota.
+        """
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            token = max(self.tokens, key=lambda state: state.quota(resource))
+            throttle = token.throttle_delay(resource)
+            if throttle:
+                time.sleep(throttle)
+
+            response = token.session.request(method, url, timeout=20, **kwargs)
+            token.record(response, resource)
+
+            delay = _retry_delay(response, attempt)
+            if delay is None or attempt == RATE_LIMIT_MAX_RETRIES:
+                return response
+            if max(self.tokens, key=lambda state: state.quota(resource)) is not token:
+                delay = 0.0 # another token still has quota, retry with it right away
+            elif delay > RATE_LIMIT_MAX_WAIT:
+                return response
+            logger.warning("GitHub rate limit hit (%s) for %s, retrying in %.0fs", response.status_code, url, delay)
+            response.close() # release the pooled connection, the body may not have been read when streaming
+            time.sleep(delay)
+
+    def _get_json(self, endpoint: str, schema: Any = Any) -> Any:
+        """
+        GETs an endpoint and decodes its JSON into `schema` with msgspec, revalidating any cached copy with
+        If-None-Match. On 304 Not Modified the cached object is returned without downloading or parsing a body.
+        """
+        cache_key = f"{self.owner}/{self.repo}/{endpoint}"
+        cached = _etag_cache_get(cache_key)
+        headers = {"If-None-Match": cached[0]} if cached else None
+
+        response = self._make_github_request("GET", endpoint, headers=headers)
+        if cached and response.status_code == 304:
+            return cached[1]
+
+        data = msgspec.json.decode(response.content, type=schema)
+        etag = response.headers.get("ETag")
+        if etag:
+            _etag_cache_put(cache_key, etag, data)
+        return data
+
+    def _make_graphql_request(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Internal helper to run a query against the GitHub GraphQL API.
+        Returns the "data" object, raising if GitHub reports query errors (GraphQL errors come back with HTTP 200).
+        """
+        logger.debug("Making GitHub GraphQL request for repository: %s/%s", self.owner, self.repo)
+        response = self._send("POST", GITHUB_GRAPHQL_URL, resource="graphql", json={"query": query, "variables": variables})
+        _raise_for_status(response)
+        payload = msgspec.json.decode(response.content)
+        if payload.get("errors"):
+            messages = "; ".join(err.get("message", "unknown error") for err in payload["errors"])
+            raise RuntimeError(f"GitHub GraphQL error: {messages}")
+        return payload.get("data") or {}
 
     def get_last_merged_pr_details(self) -> Optional[Dict[str, Any]]:
         """
         Fetches and returns details of the last merged pull request.
+        Uses a single GraphQL query filtered to merged PRs, so only the fields we return are transferred.
         Returns None if no merged PR is found, or a dictionary with error details on failure.
         """
         try:
-            response = self._make_github_request("GET", "pulls?state=closed&sort=updated&direction=desc&per_page=10")
-            pull_requests = response.json()
+            data = self._make_graphql_request(LAST_MERGED_PR_QUERY, {"owner": self.owner, "repo": self.repo})
+            repository = data.get("repository") or {}
+            nodes = (repository.get("pullRequests") or {}).get("nodes") or []
 
-            for pr in pull_requests:
-                if pr.get("merged_at"): # Indicates the PR was merged
-                    
-                    # Return a curated set of information
-                    return {
-                        "number": pr.get("number"),
-                        "title": pr.get("title"),
-                        "url": pr.get("html_url"),
-                        "merged_at": pr.get("merged_at"),
-                        "merged_by": pr.get("merged_by", {}).get("login") if pr.get("merged_by") else None,
-                        "author": pr.get("user", {}).get("login") if pr.get("user") else None,
-                        "body_summary": (pr.get("body", "")[:200] + "...") if pr.get("body") and len(pr.get("body", "")) > 200 else pr.get("body", ""),
-                        "head_commit_sha": pr.get("head", {}).get("sha") if pr.get("head") else None,
-                        "base_branch": pr.get("base", {}).get("ref") if pr.get("base") else None,
-                    }
-            print(f"No merged PRs found in the last 10 closed PRs for {self.owner}/{self.repo}.")
-            return None # Explicitly return None if no merged PR is found
+            if not nodes:
+                logger.info("No merged PRs found for %s/%s.", self.owner, self.repo)
+                return None # Explicitly return None if no merged PR is found
+
+            pr = nodes[0]
+            # Return a curated set of information
+            return {
+                "number": pr.get("number"),
+                "title": pr.get("title"),
+                "url": pr.get("url"),
+                "merged_at": pr.get("mergedAt"),
+                "merged_by": (pr.get("mergedBy") or {}).get("login"),
+                "author": (pr.get("author") or {}).get("login"),
+                "body_summary": _summary(pr.get("body")),
+                "head_commit_sha": pr.get("headRefOid"),
+                "base_branch": pr.get("baseRefName"),
+            }
         except Exception as e:
             
-            print(f"Error processing PR data in get_last_merged_pr_details for {self.owner}/{self.repo}: {e}")
+            logger.error("Error processing PR data in get_last_merged_pr_details for %s/%s: %s", self.owner, self.repo, e)
             # Return a dictionary with an error key, as the tool expects a JSON stringizable dict
             return {"error_message": f"Failed to retrieve or process last merged PR details: {str(e)}"}
     
-    def get_dir_content(self, dir_path:str = ""):
+    def get_dir_content(self, dir_path:str = "", page: int = 1, per_page: int = DEFAULT_PAGE_SIZE):
+        """
+        Lists one page of the entries at dir_path.
+        The contents API has no pagination of its own, so the full listing is fetched (and ETag cached)
+        once and paged locally; only the requested slice is converted into dicts.
+        """
         endpoint = f"contents/{dir_path}"
         try:
-            response = self._make_github_request("GET", endpoint)
-            items = response.json()
-            dir_content = []
-            for item in items:
-                dir_content.append({
-                "name": item.get("name"),
-                "path": item.get("path"),
-                "type": item.get("type"), # 'file', 'dir', 'symlink', etc.
-                "size": item.get("size"),
-                "sha": item.get("sha"),
-                "html_url": item.get("html_url"),
-                "download_url": item.get("download_url") 
-                })
-            return dir_content
-        except requests.exceptions.HTTPError as e:
+            items = self._get_json(endpoint, schema=Union[List[ContentEntry], ContentEntry])
+            if isinstance(items, ContentEntry): # path is a file, GitHub returns its single entry
+                items = [items]
+            page, per_page = max(page, 1), max(per_page, 1)
+            start = (page - 1) * per_page
+            return {
+            "path": dir_path,
+            "page": page,
+            "per_page": per_page,
+            "total_count": len(items),
+            "entries": msgspec.to_builtins(items[start:start + per_page]),
+            }
+        except GitHubAPIError as e:
             return {"error_message": f"Directory or path not found: {dir_path} in {self.owner}/{self.repo}"}
-            
+
+    def get_tree(self, sha: str = "HEAD", recursive: bool = True):
+        """
+        Lists the repository tree at a commit, branch, tag or tree sha using the Git Trees API.
+        With recursive=True the whole tree comes back in one request instead of one per directory.
+        """
+        endpoint = f"git/trees/{sha}?recursive=1" if recursive else f"git/trees/{sha}"
+        try:
+            tree = self._get_json(endpoint, schema=Tree)
+            return msgspec.to_builtins(tree)
+        except GitHubAPIError:
+            return {"error_message": f"Tree not found: {sha} in {self.owner}/{self.repo}"}
+        except requests.exceptions.RequestException as req_err:
+            return {"error_message": f"Could not retrieve tree: {sha} in {self.owner}/{self.repo}: {req_err}"}
+
+    def get_files_content(self, file_paths: List[str], ref: str = "HEAD") -> Dict[str, Any]:
+        """
+        Fetches several files in one GraphQL round trip, one aliased object(expression: "<ref>:<path>") per file.
+        Returns a dict keyed by path; paths that are missing or not files map to an error dict.
+        Blob text is null for binary files and may be cut short for very large ones ("truncated").
+        """
+        if not file_paths:
+            return {}
+        params = "".join(f", $e{i}: String!" for i in range(len(file_paths)))
+        fields = " ".join(
+            f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text byteSize oid isBinary isTruncated }} }}"
+            for i in range(len(file_paths))
+        )
+        query = f"query($owner: String!, $repo: String!{params}) {{ repository(owner: $owner, name: $repo) {{ {fields} }} }}"
+        variables = {"owner": self.owner, "repo": self.repo}
+        variables.update({f"e{i}": f"{ref}:{path.strip('/')}" for i, path in enumerate(file_paths)})
+
+        try:
+            repository = self._make_graphql_request(query, variables).get("repository") or {}
+        except Exception as e:
+            logger.error("Error fetching files in get_files_content for %s/%s: %s", self.owner, self.repo, e)
+            return {"error_message": f"Failed to retrieve file contents: {str(e)}"}
+
+        files = {}
+        for i, path in enumerate(file_paths):
+            blob = repository.get(f"f{i}")
+            if not blob: # null for a missing path, {} when the path is a directory
+                files[path] = {"error_message": f"content not found: {path} in {self.owner}/{self.repo}"}
+                continue
+            files[path] = {
+            "name": PurePosixPath(path).name,
+            "path": path.strip("/"),
+            "sha": blob.get("oid"),
+            "size": blob.get("byteSize"),
+            "binary": blob.get("isBinary"),
+            "truncated": blob.get("isTruncated"),
+            "content": blob.get("text"),
+            }
+        return files
+
     def get_file_content(self, file_path:str):
+        """
+        Fetches a file's bytes in one request using the raw media type, so there is no JSON
+        envelope to parse and no base64 to decode. Metadata the contents API used to return
+        alongside the content (sha, size, urls) is derived from the path and the bytes.
+        """
         endpoint = f"contents/{file_path}"
-        
+        cache_key = f"{self.owner}/{self.repo}/{endpoint}#raw" # raw and JSON representations have different ETags
+        cached = _etag_cache_get(cache_key)
+        if cached and cached[1]["content_path"] and not os.path.exists(cached[1]["content_path"]):
+            cached = None # the spooled copy is gone, so a 304 would leave nothing to return
+        headers = {"Accept": RAW_MEDIA_TYPE}
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
         try:
-            response = self._make_github_request("GET", endpoint=endpoint)
-            file_data = response.json()
-            
-            content_b64 = file_data.get("content")
-            decoded_content = ""
-            encoding = file_data.get("encoding")
-            
-            if content_b64 and encoding == "base64":
-                try:
-                    decoded_content = base64.b64decode(content_b64).decode('utf-8')
-                except Exception as decode_err:
-                    decoded_content = "Error: Could not decode content."
-                    encoding = "error_decoding_base64"
-            elif file_data.get("download_url"):
-                try:
-                    raw_response = requests.get(file_data["download_url"], timeout=30)
-                    decoded_content= raw_response.text
-                    encoding = raw_response.encoding or "utf-8"           
-                except Exception as dl_err:
-                    decoded_content = "Error: Could not download content."
-                    encoding = "error_downloading"
-            
-            return {
-            "name": file_data.get("name"),
-            "path": file_data.get("path"),
-            "sha": file_data.get("sha"),
-            "size": file_data.get("size"),
-            "encoding": encoding,
-            "content": decoded_content,
-            "html_url": file_data.get("html_url"),
-            "download_url": file_data.get("download_url")
-            }
-        except requests.exceptions.HTTPError as e:
+            with self._make_github_request("GET", endpoint, headers=headers, stream=True) as response:
+                if cached and response.status_code == 304:
+                    return cached[1]
+                if response.headers.get("Content-Type", "").startswith("application/json"):
+                    # GitHub answers with the JSON directory listing when the path is not a file
+                    return {"error_message": f"not a file: {file_path} in {self.owner}/{self.repo}"}
+                encoding = response.encoding or "utf-8"
+                etag = response.headers.get("ETag")
+                raw_content, content_path, size, sha = self._read_raw_stream(response, file_path)
+        except GitHubAPIError as e:
             return {"error_message": f"content not found: {file_path} in {self.owner}/{self.repo}"}
-        
-        
+        except Exception as dl_err:
+            return {"error_message": f"Could not download content: {file_path} in {self.owner}/{self.repo}: {dl_err}"}
+
+        decoded_content = ""
+        if raw_content is not None:
+            try:
+                decoded_content = raw_content.decode(encoding)
+            except UnicodeDecodeError:
+                decoded_content = "Error: Could not decode content."
+                encoding = "error_decoding"
+
+        file_content = {
+        "name": PurePosixPath(file_path).name,
+        "path": file_path.strip("/"),
+        "sha": sha,
+        "size": size,
+        "encoding": encoding,
+        "content": decoded_content,
+        "content_path": content_path,
+        "html_url": f"https://github.com/{self.owner}/{self.repo}/blob/HEAD/{file_path.strip('/')}",
+        "download_url": f"https://raw.githubusercontent.com/{self.owner}/{self.repo}/HEAD/{file_path.strip('/')}"
+        }
+        if etag:
+            _etag_cache_put(cache_key, etag, file_content)
+        return file_content
+
+    def _read_raw_stream(self, response: requests.Response, file_path: str) -> Tuple[Optional[bytes], Optional[str], int, str]:
+        """
+        Reads a streamed response body in STREAM_CHUNK_SIZE chunks.
+        Bodies up to LARGE_FILE_THRESHOLD are returned as bytes; anything larger is written to a file
+        in SPOOL_DIR as it arrives, so memory stays bounded to one chunk past the threshold. The file is
+        named after its blob sha, so spooling the same content again reuses the existing copy.
+        Returns (raw_content, content_path, size, git_blob_sha); exactly one of raw_content / content_path is set.
+        """
+        chunks = response.iter_content(STREAM_CHUNK_SIZE)
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) > LARGE_FILE_THRESHOLD:
+                fd, part_path = tempfile.mkstemp(dir=SPOOL_DIR, suffix=".part")
+                try:
+                    with os.fdopen(fd, "w+b") as tmp:
+                        tmp.write(buffer)
+                        del buffer
+                        for chunk in chunks:
+                            tmp.write(chunk)
+                        size = tmp.tell()
+                        tmp.seek(0)
+                        sha = _git_blob_sha(size, iter(lambda: tmp.read(STREAM_CHUNK_SIZE), b""))
+                    content_path = os.path.join(SPOOL_DIR, sha + PurePosixPath(file_path).suffix)
+                    if os.path.exists(content_path):
+                        os.unlink(part_path) # same blob already spooled, keep the existing copy
+                    else:
+                        os.replace(part_path, content_path)
+                except BaseException:
+                    if os.path.exists(part_path):
+                        os.unlink(part_path)
+                    raise
+                return None, content_path, size, sha
+        raw_content = bytes(buffer)
+        return raw_content, None, len(raw_content), _git_blob_sha(len(raw_content), (raw_content,))
+
+
+@lru_cache(maxsize=32)
+def _get_helper(owner: str, repo: str) -> GitHubHelper:
+    """
+    Returns a GitHubHelper for the repository, reusing the one built by an earlier tool call.
+    All helpers share the GITHUB_TOKENS pool and its sessions.
+    """
+    return GitHubHelper(owner=owner, repo=repo, tokens=GITHUB_TOKENS)
+
+
+async def _run_github_call(func, *args):
+    """
+    Runs a blocking GitHubHelper call in a worker thread so it does not block the event loop,
+    gated by GH_SEM.
+    """
+    async with GH_SEM:
+        return await asyncio.to_thread(func, *args)
+
+
 # --- MCP Tool Definition ---
 @mcp.tool()
-def get_github_last_merged_pr(owner: str, repo: str) -> str:
+async def get_github_last_merged_pr(owner: str, repo: str) -> str:
     """
     Retrieves details of the most recently merged Pull Request for a specified GitHub repository.
     This tool requires the GITHUB_TOKEN environment variable to be set for authentication,
-    especially for private repositories or to avoid rate limits.
+    especially for private repositories or to avoid rate limits. A comma-separated GITHUB_TOKENS
+    pool may be set instead to spread requests over several tokens.
     
     Args:
         owner (str): The owner (username or organization) of the GitHub repository. 
@@ -156,34 +592,28 @@ def get_github_last_merged_pr(owner: str, repo: str) -> str:
              If no merged PRs are found, it returns a JSON message indicating so.
              If an error occurs (e.g., token missing, API error), it returns a JSON error message.
     """
-    print(f"Tool 'get_github_last_merged_pr' called for repo: {owner}/{repo}")
+    logger.debug("Tool 'get_github_last_merged_pr' called for repo: %s/%s", owner, repo)
 
-    github_token = os.getenv("GITHUB_TOKEN")
-    
-    if not github_token:
-        print("CRITICAL: GITHUB_TOKEN environment variable is not set. This tool cannot function.")
+    if not GITHUB_TOKENS:
+        logger.critical("Neither GITHUB_TOKEN nor GITHUB_TOKENS environment variable is set. This tool cannot function.")
         # Return a JSON string indicating the error
-        return json.dumps({
+        return jdump({
             "error": "ConfigurationError",
-            "error_message": "GITHUB_TOKEN environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
+            "error_message": "GITHUB_TOKEN (or GITHUB_TOKENS) environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
         })
 
     try:
-        # Instantiate the helper class for this specific request
-        gh_helper = GitHubHelper(owner=owner, repo=repo, github_token=github_token)
-        pr_data = gh_helper.get_last_merged_pr_details()
+        gh_helper = _get_helper(owner, repo)
+        pr_data = await _run_github_call(gh_helper.get_last_merged_pr_details)
 
         if pr_data is None: # No merged PR found
-            return json.dumps({"message": f"No recently merged PRs found for {owner}/{repo}."})
-        elif "error_message" in pr_data: # An error occurred within the helper
-             return json.dumps(pr_data) # pr_data already contains the error dict
-        else: 
-            return json.dumps(pr_data, indent=2) # Pretty print JSON for readability
+            return jdump({"message": f"No recently merged PRs found for {owner}/{repo}."})
+        return jdump(pr_data) # pr_data is either the PR details or the helper's error dict
 
     except Exception as e:
         
-        print(f"Unexpected tool error in 'get_github_last_merged_pr' for {owner}/{repo}: {e}")
-        return json.dumps({
+        logger.exception("Unexpected tool error in 'get_github_last_merged_pr' for %s/%s: %s", owner, repo, e)
+        return jdump({
             "error": "ToolExecutionError",
             "error_message": f"An unexpected error occurred in the tool: {str(e)}",
             "details": {"owner": owner, "repo": repo}
@@ -191,7 +621,7 @@ def get_github_last_merged_pr(owner: str, repo: str) -> str:
 
 
 @mcp.tool()
-def get_repo_contents(owner:str, repo:str, path:str = ""):
+async def get_repo_contents(owner:str, repo:str, path:str = "", include_content: bool = False, page: int = 1, per_page: int = DEFAULT_PAGE_SIZE):
     """
     Lists files and directories at a given path within a specified GitHub repository.
     If the path points to a file, it may return details about that file instead (behavior of GitHub API).
@@ -202,33 +632,82 @@ def get_repo_contents(owner:str, repo:str, path:str = ""):
         repo (str): The name of the GitHub repository. Example: "Spoon-Knife"
         path (str, optional): The path within the repository to list. Defaults to the root directory ("").
                              Example: "src/components", "README.md"
+        include_content (bool, optional): If True, the decoded content of every file in the returned page
+                             is fetched concurrently and added to its entry under "content". Files over 1 MiB
+                             get an empty "content" plus "content_path" (a local temporary file), and files that
+                             could not be fetched get "error_message" instead. Defaults to False.
+        page (int, optional): The 1-based page of entries to return. Defaults to 1.
+        per_page (int, optional): The number of entries per page. Defaults to 100.
     Returns:
-        str: A JSON string. If path is a directory, it's a list of objects, each representing a file or
-             directory with keys like "name", "path", "type", "size", "sha", "html_url", "download_url".
-             If path is a file, it may return a single object with file details (potentially including
-             base64 encoded content if small).
+        str: A JSON string with "path", "page", "per_page", "total_count" (entries across all pages) and
+             "entries", a list of objects, each representing a file or directory with keys like
+             "name", "path", "type", "size", "sha", "html_url", "download_url".
+             If path is a file, "entries" holds that single file.
              Returns a JSON error object on failure.
-             Example (directory): [{"name": "file.py", "type": "file", ...}, {"name": "subdir", "type": "dir", ...}]
+             Example (directory): {"path": "src", "page": 1, "per_page": 100, "total_count": 2,
+                                   "entries": [{"name": "file.py", "type": "file", ...}, {"name": "subdir", "type": "dir", ...}]}
              Example (error): {"error": "...", "details": "..."}
     """
     
-    github_token = os.getenv("GITHUB_TOKEN")
-    
-    if not github_token:
-        return json.dumps({
+    if not GITHUB_TOKENS:
+        return jdump({
             "error": "ConfigurationError",
-            "error_message": "GITHUB_TOKEN environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
+            "error_message": "GITHUB_TOKEN (or GITHUB_TOKENS) environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
         })
     
-    gh_helper = GitHubHelper(owner=owner, repo=repo, github_token=github_token)
-    contents = gh_helper.get_dir_content(path) 
+    gh_helper = _get_helper(owner, repo)
+    contents = await _run_github_call(gh_helper.get_dir_content, path, page, per_page)
+
+    if include_content and "entries" in contents:
+        file_entries = [entry for entry in contents["entries"] if entry.get("type") == "file"]
+        file_contents = await asyncio.gather(
+            *(_run_github_call(gh_helper.get_file_content, entry["path"]) for entry in file_entries)
+        )
+        for entry, file_content in zip(file_entries, file_contents):
+            if "error_message" in file_content:
+                entry["error_message"] = file_content["error_message"]
+                continue
+            entry["content"] = file_content.get("content")
+            if file_content.get("content_path"):
+                entry["content_path"] = file_content["content_path"]
     # if contents is None:
-    #     return json.dumps({"error": "NotFound", "error_message": f"Path '{path}' not found in {owner}/{repo}."})
-    return json.dumps(contents, indent=2)
+    #     return jdump({"error": "NotFound", "error_message": f"Path '{path}' not found in {owner}/{repo}."})
+    return jdump(contents)
+
+
+@mcp.tool()
+async def list_repo_tree(owner: str, repo: str, ref: str = "HEAD"):
+    """
+    Lists every file and directory in a GitHub repository in a single request, using the Git Trees API.
+    Prefer this over calling get_repo_contents once per subdirectory when you need the whole layout.
+    Requires GITHUB_TOKEN environment variable for authentication.
+
+    Args:
+        owner (str): The owner/organization of the GitHub repository. Example: "octocat"
+        repo (str): The name of the GitHub repository. Example: "Spoon-Knife"
+        ref (str, optional): The branch, tag, commit sha or tree sha to list. Defaults to "HEAD" (the default branch).
+                             Example: "main", "v1.0.0"
+    Returns:
+        str: A JSON string with "sha" (the tree sha), "truncated" (True if GitHub cut the listing short for very
+             large repositories) and "tree", a list of objects with keys "path", "type" ("blob" for files,
+             "tree" for directories), "sha" and "size" (files only).
+             Returns a JSON error object on failure.
+             Example: {"sha": "...", "truncated": false, "tree": [{"path": "src/main.py", "type": "blob", ...}]}
+    """
+    if not GITHUB_TOKENS:
+        return jdump({
+            "error": "ConfigurationError",
+            "error_message": "GITHUB_TOKEN (or GITHUB_TOKENS) environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
+        })
+
+    gh_helper = _get_helper(owner, repo)
+    tree = await _run_github_call(gh_helper.get_tree, ref)
+
+    return jdump(tree)
 
 
 @mcp.tool()
-def get_file_contents(owner:str, repo:str, path:str):
+async def get_file_contents(owner:str, repo:str, path:str):
     """
     Retrieves the decoded content and details of a specific file from a GitHub repository.
     Requires GITHUB_TOKEN environment variable for authentication.
@@ -241,45 +720,73 @@ def get_file_contents(owner:str, repo:str, path:str):
     Returns:
         str: A JSON string containing an object with keys like "name", "path", "size", "encoding", 
              and "content" (the decoded file content).
+             Files larger than 1 MiB (up to GitHub's 100 MB raw limit) are not returned inline: "content" is empty and "content_path"
+             holds the path of a local temporary file containing the downloaded bytes (removed when the server exits).
              Returns a JSON error object on failure or if the path is not a file.
              Example (success): {"name": "main.py", "path": "src/main.py", "content": "print('hello')", ...}
              Example (error): {"error": "NotFound", "error_message": "File 'path/to/file.ext' not found."}
     """
     
-    github_token = os.getenv("GITHUB_TOKEN")
-    
-    if not github_token:
-        return json.dumps({
+    if not GITHUB_TOKENS:
+        return jdump({
             "error": "ConfigurationError",
-            "error_message": "GITHUB_TOKEN environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
+            "error_message": "GITHUB_TOKEN (or GITHUB_TOKENS) environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
         })
     
-    gh_helper = GitHubHelper(owner=owner, repo=repo, github_token=github_token)
+    gh_helper = _get_helper(owner, repo)
     
-    file_content = gh_helper.get_file_content(path)
+    file_content = await _run_github_call(gh_helper.get_file_content, path)
     
     if file_content is None: 
-        return json.dumps({"error": "NotFound", "error_message": f"File '{path}' not found in {owner}/{repo}."})
-    if "error_message" in file_content: 
-        return json.dumps(file_content)
+        return jdump({"error": "NotFound", "error_message": f"File '{path}' not found in {owner}/{repo}."})
     
-    return json.dumps(file_content, indent=2)
+    return jdump(file_content)
+
+
+@mcp.tool()
+async def get_files_contents(owner: str, repo: str, paths: List[str], ref: str = "HEAD"):
+    """
+    Retrieves the contents of several files from a GitHub repository in a single request.
+    Prefer this over calling get_file_contents once per file.
+    Requires GITHUB_TOKEN environment variable for authentication.
+
+    Args:
+        owner (str): The owner/organization of the GitHub repository.
+        repo (str): The name of the GitHub repository.
+        paths (list[str]): The full paths of the files within the repository. Example: ["src/main.py", "README.md"]
+        ref (str, optional): The branch, tag or commit to read from. Defaults to "HEAD" (the default branch).
+
+    Returns:
+        str: A JSON string containing an object keyed by path. Each value has keys "name", "path", "sha", "size",
+             "binary", "truncated" and "content" (null for binary files), or "error_message" if that path
+             could not be read.
+             Returns a JSON error object if the request as a whole fails.
+             Example (success): {"src/main.py": {"name": "main.py", "content": "print('hello')", ...},
+                                 "missing.txt": {"error_message": "content not found: ..."}}
+    """
+    if not GITHUB_TOKENS:
+        return jdump({
+            "error": "ConfigurationError",
+            "error_message": "GITHUB_TOKEN (or GITHUB_TOKENS) environment variable not set on the server. Please ensure it's configured for the MCP server process (e.g., in Claude Desktop's mcpServers config)."
+        })
+
+    gh_helper = _get_helper(owner, repo)
+    files = await _run_github_call(gh_helper.get_files_content, paths, ref)
+
+    return jdump(files)
+
+
 # --- Main Execution Block ---
 if __name__ == "__main__":
     # This block is executed when you run `python server.py` directly
 
-    print("-----------------------------------------------------")
-    print("GitHub Last PR MCP Server attempting to start...")
-    print("-----------------------------------------------------")
+    logger.info("GitHub Last PR MCP Server attempting to start...")
 
-    if not os.getenv("GITHUB_TOKEN"):
-        print("WARNING: GITHUB_TOKEN environment variable is NOT set.")
-        print("The 'get_github_last_merged_pr' tool will fail until GITHUB_TOKEN is provided to this server's environment.")
+    if not GITHUB_TOKENS:
+        logger.warning("GITHUB_TOKEN environment variable is NOT set. The GitHub tools will fail until GITHUB_TOKEN (or GITHUB_TOKENS) is provided to this server's environment.")
     else:
-        print("GITHUB_TOKEN environment variable is set.")
+        logger.info("Loaded %d GitHub token(s).", len(GITHUB_TOKENS))
 
     mcp.run(transport='stdio')
 
-    print("-----------------------------------------------------")
-    print("GitHub Last PR MCP Server has shut down.")
-    print("-----------------------------------------------------")
\ No newline at end of file
+    logger.info("GitHub Last PR MCP Server has shut down.")
\ No newline at end of file
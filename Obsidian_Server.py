@@ -1,5 +1,10 @@
 import os
-import json
+import sys
+import logging
+import stat
+import tempfile
+import anyio
+import orjson
 from pathlib import Path
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
@@ -7,17 +12,33 @@ from dotenv import load_dotenv
 load_dotenv()
 mcp = FastMCP("Obsidian_MCP")
 
+# stdout carries the MCP stdio transport, so diagnostics go to stderr through logging
+logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+logger = logging.getLogger("obsidian_mcp")
+
+
+def jdump(obj) -> str:
+    """Serializes a tool result to compact JSON; the client parses it, so indentation only adds bytes."""
+    return orjson.dumps(obj).decode()
+
+
 VAULT_PATH_VALUE = os.getenv("VAULT_PATH")
 
 
-if VAULT_PATH_VALUE:
-    VAULT_PATH = Path(VAULT_PATH_VALUE)
+VAULT_PATH = Path(VAULT_PATH_VALUE) if VAULT_PATH_VALUE else None
+# Resolved once at startup; note paths are then normalized lexically against it, without touching the filesystem
+VAULT_ROOT = VAULT_PATH.resolve() if VAULT_PATH else None
+# os.umask can only be read by setting it, so read it once here, before any worker threads exist
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 def get_path(note_path:str):
-    if not VAULT_PATH:
+    if not VAULT_ROOT:
         return None
     
-    full_path = (VAULT_PATH/note_path).resolve()
+    full_path = Path(os.path.normpath(VAULT_ROOT / note_path))
+    if full_path != VAULT_ROOT and VAULT_ROOT not in full_path.parents:
+        return None # note_path escapes the vault, e.g. "../../etc/passwd" or an absolute path
     
     return full_path
 
@@ -26,40 +47,83 @@ def read_note(full_path:Path):
         return full_path.read_text(encoding="utf-8")
     return None
 
+WRITE_BUFFER_SIZE = 1 << 16
+
+def write_note(full_path: Path, data: bytes, append: bool = False, ensure_newline: bool = False, durable: bool = False) -> None:
+    """
+    Single write path for notes: content is encoded once by the caller and written as bytes through
+    one 64 KiB buffered handle. With ensure_newline, an append first adds a newline if the note
+    doesn't already end with one. With durable, the data is fsynced to disk before returning.
+    """
+    # 'a+b' appends, and allows reading back the last byte
+    with open(full_path, "a+b" if append else "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        if append and ensure_newline and f.seek(0, os.SEEK_END) > 0:
+            # Only the final byte matters, so seek to it instead of reading the whole note
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+
 def append_note(full_path: Path, content_to_append: str, ensure_newline: bool = True) -> bool:
     try:
         if full_path and full_path.is_file() and full_path.suffix.lower() == ".md":
-            with full_path.open("a", encoding="utf-8") as f: # 'a' for append mode
-                if ensure_newline:
-                    current_content = full_path.read_text(encoding="utf-8")
-                    if current_content and not current_content.endswith('\n'):
-                        f.write('\n')
-                f.write(content_to_append)
+            write_note(full_path, content_to_append.encode("utf-8"), append=True, ensure_newline=ensure_newline)
             return True
         return False
     except Exception as e:
         return False
     
+def fsync_dir(dir_path: Path) -> None:
+    """Fsyncs a directory so a rename inside it is durable; a no-op where directories can't be opened (Windows)."""
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
 def create_note(relative_path:str, content:str):
     if not VAULT_PATH:
         return None
     if not relative_path.endswith(".md"):
         relative_path += ".md"
-    full_path = VAULT_PATH / relative_path
+    full_path = get_path(relative_path)
     if not full_path:
         return None
     
+    # Write to a uniquely named sibling temp file, fsync it and swap it in, so neither a crash nor a
+    # concurrent create of the same note can leave a half-written note behind
+    tmp_path = None
     try:
         full_path.parent.mkdir(parents=True, exist_ok=True)
-        full_path.write_text(content, encoding="utf-8")
+        # A symlinked note is overwritten at its target, as a plain write would, instead of being replaced by a file
+        target_path = Path(os.path.realpath(full_path)) if full_path.is_symlink() else full_path
+        try:
+            mode = stat.S_IMODE(target_path.stat().st_mode) # keep an existing note's permissions
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK # what a plain open() would give a new note
+        fd, tmp_name = tempfile.mkstemp(dir=target_path.parent, prefix=target_path.name, suffix=".tmp")
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        os.chmod(tmp_path, mode) # mkstemp creates the file 0600
+        write_note(tmp_path, content.encode("utf-8"), durable=True)
+        os.replace(tmp_path, target_path)
+        fsync_dir(target_path.parent)
         return full_path
     except Exception as e:
-        print(f"Error creating markdown note: {e}")
+        logger.error("Error creating markdown note: %s", e)
+        if tmp_path:
+            tmp_path.unlink(missing_ok=True)
         return None 
 
 
 @mcp.tool()
-def get_obsidian_note(note_path:str):
+async def get_obsidian_note(note_path:str):
     """
     Retrieves the content of a specific note from your Obsidian vault.
     The server must be configured with the OBSIDIAN_VAULT_PATH environment variable.
@@ -76,22 +140,23 @@ def get_obsidian_note(note_path:str):
              Example error: {"error": "Note not found or could not be read: path/to/note.md"}
     """
     if not VAULT_PATH:
-         return json.dumps({"error": "OBSIDIAN_VAULT_PATH not configured on server."})
+         return jdump({"error": "OBSIDIAN_VAULT_PATH not configured on server."})
      
     full_path = get_path(note_path=note_path)
     if not full_path:
-        return json.dumps({"error": f"Invalid note path or access denied: {note_path}"})
+        return jdump({"error": f"Invalid note path or access denied: {note_path}"})
      
-    content = read_note(full_path=full_path)
+    # Disk I/O runs in a worker thread so concurrent tool calls are not serialized on the event loop
+    content = await anyio.to_thread.run_sync(read_note, full_path)
     
     if content is not None:
-        return json.dumps({"path": note_path, "content": content})
+        return jdump({"path": note_path, "content": content})
     else:
-        return json.dumps({"error": f"Note not found or could not be read: {note_path}"})
+        return jdump({"error": f"Note not found or could not be read: {note_path}"})
 
 
 @mcp.tool()
-def create_obsidian_note(relative_path: str, content: str) -> str:
+async def create_obsidian_note(relative_path: str, content: str) -> str:
     """
     Creates a new note (or overwrites an existing one) in your Obsidian vault.
     The server must be configured with the OBSIDIAN_VAULT_PATH environment variable.
@@ -110,27 +175,27 @@ def create_obsidian_note(relative_path: str, content: str) -> str:
              Example error: {"error": "Failed to create note at: path/to/note"}
     """
     if not VAULT_PATH:
-         return json.dumps({"error": "VAULT_PATH not configured on server."})
+         return jdump({"error": "VAULT_PATH not configured on server."})
     
-    create_path = create_note(relative_path=relative_path, content=content) 
+    create_path = await anyio.to_thread.run_sync(create_note, relative_path, content)
     
     if create_path:
         try:
             if VAULT_PATH:
-                 created_relative_path_str = str(create_path.relative_to(VAULT_PATH))
+                 created_relative_path_str = str(create_path.relative_to(VAULT_ROOT))
             else: 
                  created_relative_path_str = str(create_path) # Fallback, less ideal
 
-            return json.dumps({"message": "Note created/updated successfully.", 
+            return jdump({"message": "Note created/updated successfully.", 
                                "path": created_relative_path_str})
         except ValueError:
-            return json.dumps({"error": f"Failed to determine relative path for created note: {str(create_path)}"})
+            return jdump({"error": f"Failed to determine relative path for created note: {str(create_path)}"})
 
     else:
-        return json.dumps({"error": f"Failed to create note at: {relative_path}"})
+        return jdump({"error": f"Failed to create note at: {relative_path}"})
 
 @mcp.tool()
-def append_obsidian_note(note_path: str, content_to_append: str) -> str: # 
+async def append_obsidian_note(note_path: str, content_to_append: str) -> str: # 
     """
     Appends content to an existing note in your Obsidian vault.
     The server must be configured with the OBSIDIAN_VAULT_PATH environment variable.
@@ -148,18 +213,18 @@ def append_obsidian_note(note_path: str, content_to_append: str) -> str: #
              Example error: {"error": "Note not found or is not a file: Journal/My Thoughts.md"}
     """
     if not VAULT_PATH:
-         return json.dumps({"error": "VAULT_PATH not configured on server."})
+         return jdump({"error": "VAULT_PATH not configured on server."})
     
     full_path_obj = get_path(note_path)
-    if not full_path_obj or not full_path_obj.is_file():
-        return json.dumps({"error": f"Note not found or is not a file (cannot append): {note_path}"})
+    if not full_path_obj or not await anyio.to_thread.run_sync(full_path_obj.is_file):
+        return jdump({"error": f"Note not found or is not a file (cannot append): {note_path}"})
     
-    success = append_note(full_path=full_path_obj, content_to_append=content_to_append) 
+    success = await anyio.to_thread.run_sync(append_note, full_path_obj, content_to_append)
     
     if success:
-        return json.dumps({"message": f"Content appended to '{note_path}' successfully."})
+        return jdump({"message": f"Content appended to '{note_path}' successfully."})
     else:
-        return json.dumps({"error": f"Failed to append content to note: {note_path}"})
+        return jdump({"error": f"Failed to append content to note: {note_path}"})
     
 if __name__ == "__main__":
     mcp.run(transport = "stdio")
\ No newline at end of file